@@ -4,236 +4,161 @@ Simplified version using basic Python libraries and built-in HTTP server
 """
 
 import http.server
+import socket
 import socketserver
 import json
+import queue
+import re
 import sqlite3
+import threading
+import time
 import urllib.parse
+import zlib
+from contextlib import contextmanager
+from string import Template
 from datetime import datetime, date
+from functools import lru_cache
+from html import escape as E
 import os
-import base64
 from io import BytesIO
 
 # Database setup
 DATABASE = 'demographic.db'
 
-def init_database():
-    """Initialize the SQLite database with tables"""
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    
-    # Create tables
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS locations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            address TEXT,
-            phone TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS patients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            patient_id TEXT UNIQUE NOT NULL,
-            first_name TEXT NOT NULL,
-            last_name TEXT NOT NULL,
-            date_of_birth DATE NOT NULL,
-            gender TEXT NOT NULL,
-            phone TEXT NOT NULL,
-            email TEXT,
-            address TEXT,
-            emergency_contact TEXT,
-            location_id INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (location_id) REFERENCES locations (id)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS health_records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            patient_id INTEGER NOT NULL,
-            location_id INTEGER NOT NULL,
-            height REAL,
-            weight REAL,
-            temperature REAL,
-            blood_pressure_systolic INTEGER,
-            blood_pressure_diastolic INTEGER,
-            heart_rate INTEGER,
-            notes TEXT,
-            recorded_by TEXT NOT NULL,
-            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (patient_id) REFERENCES patients (id),
-            FOREIGN KEY (location_id) REFERENCES locations (id)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS blood_samples (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sample_id TEXT UNIQUE NOT NULL,
-            patient_id INTEGER NOT NULL,
-            collection_location_id INTEGER NOT NULL,
-            test_location_id INTEGER,
-            collected_by TEXT NOT NULL,
-            collected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            test_type TEXT NOT NULL,
-            status TEXT DEFAULT 'collected',
-            results TEXT,
-            tested_by TEXT,
-            tested_at TIMESTAMP,
-            results_sent_at TIMESTAMP,
-            FOREIGN KEY (patient_id) REFERENCES patients (id),
-            FOREIGN KEY (collection_location_id) REFERENCES locations (id),
-            FOREIGN KEY (test_location_id) REFERENCES locations (id)
-        )
-    ''')
-    
-    # Insert default location if none exists
-    cursor.execute('SELECT COUNT(*) FROM locations')
-    if cursor.fetchone()[0] == 0:
-        cursor.execute('''
-            INSERT INTO locations (name, address, phone)
-            VALUES ('Main Hospital', '123 Healthcare Street, Medical City', '+1234567890')
-        ''')
-    
-    conn.commit()
-    conn.close()
-
-def generate_patient_id():
-    """Generate unique patient ID"""
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM patients')
-    count = cursor.fetchone()[0]
-    conn.close()
-    return f"PAT{(count + 1):06d}"
-
-def generate_sample_id():
-    """Generate unique sample ID"""
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM blood_samples')
-    count = cursor.fetchone()[0]
-    conn.close()
-    return f"BS{(count + 1):06d}"
-
-def generate_qr_code_simple(data):
-    """Generate a simple text-based QR representation (placeholder)"""
-    return f"QR:{data}"
-
-def simulate_whatsapp_send(phone, message):
-    """Simulate WhatsApp message sending"""
-    print(f"[WhatsApp Simulation] Sending to {phone}:")
-    print(f"Message: {message}")
-    return True
+# SQL statements used by the handlers. Hoisted to module level so the same
+# string object is passed to cursor.execute() every time, letting sqlite3's
+# per-connection statement cache skip re-parsing the query. Never build SQL
+# with f-string interpolation; parameterize with ? placeholders.
+SQL_DASHBOARD_COUNTS = '''
+    SELECT (SELECT COUNT(*) FROM patients),
+           (SELECT COUNT(*) FROM locations),
+           (SELECT value FROM counters WHERE name = 'pending_samples')
+'''
+SQL_RECENT_PATIENTS = '''
+    SELECT p.*, l.name as location_name FROM patients p
+    JOIN locations l ON p.location_id = l.id
+    ORDER BY p.created_at DESC LIMIT 5
+'''
+SQL_LIST_PATIENTS = '''
+    SELECT p.*, l.name as location_name FROM patients p
+    JOIN locations l ON p.location_id = l.id
+    ORDER BY p.created_at DESC
+    LIMIT ? OFFSET ?
+'''
+SQL_GET_PATIENT = '''
+    SELECT patient_id, first_name, last_name FROM patients WHERE patient_id = ?
+'''
+# The detail page's health records and blood samples ride along as JSON1
+# aggregates, so the whole page costs one prepared statement and one
+# Python<->SQLite round-trip instead of three.
+SQL_GET_PATIENT_DETAILS = '''
+    SELECT p.*, l.name as location_name,
+           (SELECT json_group_array(json_object(
+                'recorded_at', hr.recorded_at,
+                'location_name', (SELECT name FROM locations WHERE id = hr.location_id),
+                'height', hr.height,
+                'weight', hr.weight,
+                'temperature', hr.temperature,
+                'bp_systolic', hr.blood_pressure_systolic,
+                'bp_diastolic', hr.blood_pressure_diastolic,
+                'heart_rate', hr.heart_rate,
+                'recorded_by', hr.recorded_by))
+            FROM health_records hr WHERE hr.patient_id = p.id) as health_records_json,
+           (SELECT json_group_array(json_object(
+                'sample_id', bs.sample_id,
+                'test_type', bs.test_type,
+                'status', bs.status,
+                'collected_at', bs.collected_at))
+            FROM blood_samples bs WHERE bs.patient_id = p.id) as blood_samples_json
+    FROM patients p
+    JOIN locations l ON p.location_id = l.id
+    WHERE p.patient_id = ?
+'''
+SQL_LIST_LOCATIONS = 'SELECT * FROM locations ORDER BY created_at DESC'
+SQL_LOCATION_OPTIONS = 'SELECT id, name FROM locations'
+SQL_LIST_SAMPLES = '''
+    SELECT bs.*, p.first_name, p.last_name, p.patient_id as patient_code, cl.name as collection_location
+    FROM blood_samples bs
+    JOIN patients p ON bs.patient_id = p.id
+    JOIN locations cl ON bs.collection_location_id = cl.id
+    ORDER BY bs.collected_at DESC
+    LIMIT ? OFFSET ?
+'''
+SQL_GET_SAMPLE_WITH_PATIENT = '''
+    SELECT bs.sample_id, bs.test_type, bs.tested_by, bs.results,
+           p.first_name, p.last_name, p.patient_id as patient_code
+    FROM blood_samples bs
+    JOIN patients p ON bs.patient_id = p.id
+    WHERE bs.sample_id = ?
+'''
+SQL_GET_TESTED_SAMPLE = '''
+    SELECT bs.sample_id, bs.test_type, bs.results, bs.tested_by, bs.tested_at,
+           p.first_name, p.last_name, p.patient_id as patient_code, p.phone
+    FROM blood_samples bs
+    JOIN patients p ON bs.patient_id = p.id
+    WHERE bs.sample_id = ? AND bs.status = 'tested'
+'''
+SQL_INSERT_PATIENT = '''
+    INSERT INTO patients
+    (patient_id, first_name, last_name, date_of_birth, gender, phone, email, address, emergency_contact, location_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SQL_ASSIGN_PATIENT_ID = 'UPDATE patients SET patient_id = ? WHERE id = ?'
+SQL_BACKFILL_PATIENT_IDS = "UPDATE patients SET patient_id = 'PAT' || printf('%06d', id) WHERE patient_id LIKE 'PENDING-%'"
+SQL_ASSIGN_SAMPLE_ID = 'UPDATE blood_samples SET sample_id = ? WHERE id = ?'
+SQL_INSERT_LOCATION = 'INSERT INTO locations (name, address, phone) VALUES (?, ?, ?)'
+SQL_INSERT_HEALTH_RECORD = '''
+    INSERT INTO health_records
+    (patient_id, location_id, height, weight, temperature, blood_pressure_systolic,
+     blood_pressure_diastolic, heart_rate, notes, recorded_by)
+    SELECT id, ?, ?, ?, ?, ?, ?, ?, ?, ? FROM patients WHERE patient_id = ?
+'''
+# Numeric vitals in SQL_INSERT_HEALTH_RECORD order, paired with their
+# coercion; empty form fields become NULL. Both the form and the bulk CSV
+# handler loop over this table instead of repeating the ternaries.
+HEALTH_RECORD_FIELDS = (
+    ('height', float),
+    ('weight', float),
+    ('temperature', float),
+    ('bp_systolic', int),
+    ('bp_diastolic', int),
+    ('heart_rate', int),
+)
+SQL_INSERT_BLOOD_SAMPLE = '''
+    INSERT INTO blood_samples
+    (sample_id, patient_id, collection_location_id, test_type, collected_by, status)
+    SELECT ?, id, ?, ?, ?, 'collected' FROM patients WHERE patient_id = ?
+'''
+SQL_UPDATE_TEST_RESULTS = '''
+    UPDATE blood_samples
+    SET test_location_id = ?, results = ?, tested_by = ?,
+        tested_at = CURRENT_TIMESTAMP, status = 'tested'
+    WHERE sample_id = ?
+'''
+SQL_MARK_RESULTS_SENT = '''
+    UPDATE blood_samples
+    SET status = 'results_sent', results_sent_at = CURRENT_TIMESTAMP
+    WHERE sample_id = ?
+'''
 
-class DemographicHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        """Handle GET requests"""
-        if self.path == '/':
-            self.send_dashboard()
-        elif self.path == '/patients':
-            self.send_patients_list()
-        elif self.path == '/locations':
-            self.send_locations_list()
-        elif self.path == '/blood_samples':
-            self.send_blood_samples_list()
-        elif self.path.startswith('/patient/'):
-            patient_id = self.path.split('/')[-1]
-            self.send_patient_details(patient_id)
-        elif self.path == '/register_patient':
-            self.send_register_patient_form()
-        elif self.path == '/search_patient':
-            self.send_search_patient_form()
-        elif self.path == '/add_location':
-            self.send_add_location_form()
-        elif self.path.startswith('/add_health_record/'):
-            patient_id = self.path.split('/')[-1]
-            self.send_add_health_record_form(patient_id)
-        elif self.path.startswith('/collect_blood_sample/'):
-            patient_id = self.path.split('/')[-1]
-            self.send_collect_blood_sample_form(patient_id)
-        elif self.path.startswith('/update_test_results/'):
-            sample_id = self.path.split('/')[-1]
-            self.send_update_test_results_form(sample_id)
-        elif self.path.startswith('/send_results/'):
-            sample_id = self.path.split('/')[-1]
-            self.handle_send_results(sample_id)
-        else:
-            self.send_error(404, "Page not found")
-    
-    def do_POST(self):
-        """Handle POST requests"""
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length)
-        data = urllib.parse.parse_qs(post_data.decode('utf-8'))
-        
-        if self.path == '/register_patient':
-            self.handle_register_patient(data)
-        elif self.path == '/search_patient':
-            self.handle_search_patient(data)
-        elif self.path == '/add_location':
-            self.handle_add_location(data)
-        elif self.path.startswith('/add_health_record/'):
-            patient_id = self.path.split('/')[-1]
-            self.handle_add_health_record(patient_id, data)
-        elif self.path.startswith('/collect_blood_sample/'):
-            patient_id = self.path.split('/')[-1]
-            self.handle_collect_blood_sample(patient_id, data)
-        elif self.path.startswith('/update_test_results/'):
-            sample_id = self.path.split('/')[-1]
-            self.handle_update_test_results(sample_id, data)
-        else:
-            self.send_error(404, "Action not found")
-    
-    def send_html_response(self, content):
-        """Send HTML response"""
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        self.wfile.write(content.encode('utf-8'))
-    
-    def send_dashboard(self):
-        """Send dashboard page"""
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*) FROM patients')
-        total_patients = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM locations')
-        total_locations = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM blood_samples WHERE status = 'collected'")
-        pending_samples = cursor.fetchone()[0]
-        
-        cursor.execute('''
-            SELECT p.*, l.name as location_name FROM patients p
-            JOIN locations l ON p.location_id = l.id
-            ORDER BY p.created_at DESC LIMIT 5
-        ''')
-        recent_patients = cursor.fetchall()
-        
-        conn.close()
-        
-        html = f'''
+# Static HTML skeletons, encoded once at import time. Handlers only build
+# the small dynamic fragment per request and write head + fragment + tail.
+DASHBOARD_HEAD = '''
         <!DOCTYPE html>
         <html>
         <head>
             <title>Patient Demographic System</title>
             <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .header {{ background: #007bff; color: white; padding: 20px; text-align: center; }}
-                .nav {{ background: #f8f9fa; padding: 10px; }}
-                .nav a {{ margin-right: 20px; text-decoration: none; color: #007bff; }}
-                .stats {{ display: flex; gap: 20px; margin: 20px 0; }}
-                .stat-card {{ background: #f8f9fa; padding: 20px; border-radius: 5px; flex: 1; text-align: center; }}
-                .actions {{ background: white; padding: 20px; border: 1px solid #ddd; border-radius: 5px; margin: 20px 0; }}
-                .recent {{ background: white; padding: 20px; border: 1px solid #ddd; border-radius: 5px; }}
-                .btn {{ background: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 3px; display: inline-block; margin: 5px; }}
-                .btn:hover {{ background: #0056b3; }}
+                body { font-family: Arial, sans-serif; margin: 20px; }
+                .header { background: #007bff; color: white; padding: 20px; text-align: center; }
+                .nav { background: #f8f9fa; padding: 10px; }
+                .nav a { margin-right: 20px; text-decoration: none; color: #007bff; }
+                .stats { display: flex; gap: 20px; margin: 20px 0; }
+                .stat-card { background: #f8f9fa; padding: 20px; border-radius: 5px; flex: 1; text-align: center; }
+                .actions { background: white; padding: 20px; border: 1px solid #ddd; border-radius: 5px; margin: 20px 0; }
+                .recent { background: white; padding: 20px; border: 1px solid #ddd; border-radius: 5px; }
+                .btn { background: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 3px; display: inline-block; margin: 5px; }
+                .btn:hover { background: #0056b3; }
             </style>
         </head>
         <body>
@@ -247,64 +172,145 @@ class DemographicHandler(http.server.SimpleHTTPRequestHandler):
                 <a href="/blood_samples">Blood Samples</a>
                 <a href="/search_patient">Search Patient</a>
             </div>
-            
-            <div class="stats">
-                <div class="stat-card">
-                    <h3>{total_patients}</h3>
-                    <p>Total Patients</p>
-                </div>
-                <div class="stat-card">
-                    <h3>{total_locations}</h3>
-                    <p>Locations</p>
-                </div>
-                <div class="stat-card">
-                    <h3>{pending_samples}</h3>
-                    <p>Pending Tests</p>
+'''.encode('utf-8')
+
+DASHBOARD_TAIL = '''
+        </body>
+        </html>
+        '''.encode('utf-8')
+
+PATIENTS_LIST_HEAD = '''
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Patients</title>
+            <style>
+                body { font-family: Arial, sans-serif; margin: 20px; }
+                .nav { margin-bottom: 20px; }
+                .nav a { color: #007bff; text-decoration: none; margin-right: 10px; }
+                .btn { background: #007bff; color: white; padding: 10px 15px; text-decoration: none; border-radius: 3px; }
+                .btn:hover { background: #0056b3; }
+                table { margin: 20px 0; }
+                th, td { padding: 8px; text-align: left; }
+            </style>
+        </head>
+        <body>
+            <div class="nav">
+                <a href="/">&larr; Dashboard</a>
+            </div>
+            <h2>Patients</h2>
+            <a href="/register_patient" class="btn">Register New Patient</a>
+'''.encode('utf-8')
+
+PATIENTS_TABLE_OPEN = ('<table border="1" style="width:100%; border-collapse: collapse;">'
+                       '<tr><th>Patient ID</th><th>Name</th><th>DOB</th><th>Gender</th>'
+                       '<th>Phone</th><th>Location</th><th>Actions</th></tr>').encode('utf-8')
+
+PAGE_TAIL = b'</body></html>'
+
+# Shared form stylesheet, extracted from the individual form pages so the
+# ~600 bytes of CSS travel once per client (then 304s) instead of being
+# rewritten into every form response. Read into memory at import and
+# served straight from the bytes object.
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       'static', 'forms.css'), 'rb') as _css:
+    FORMS_CSS = _css.read()
+FORMS_CSS_ETAG = f'"{zlib.crc32(FORMS_CSS):08x}"'
+
+PATIENT_DETAIL_TITLE_OPEN = ('<!DOCTYPE html><html><head>'
+                             '<title>Patient Details - ').encode('utf-8')
+
+PATIENT_DETAIL_HEAD = '''</title>
+            <style>
+                body { font-family: Arial, sans-serif; margin: 20px; }
+                .patient-info { background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 20px; }
+                .actions { margin: 20px 0; }
+                .btn { background: #007bff; color: white; padding: 10px 15px; text-decoration: none; border-radius: 3px; margin-right: 10px; }
+                .btn:hover { background: #0056b3; }
+                table { margin: 20px 0; }
+                th, td { padding: 8px; text-align: left; }
+                .nav { margin-bottom: 20px; }
+                .nav a { color: #007bff; text-decoration: none; margin-right: 10px; }
+                .qr { background: #e9ecef; padding: 20px; text-align: center; margin: 20px 0; }
+            </style>
+        </head>
+        <body>
+'''.encode('utf-8')
+
+
+# Fully static pages, encoded once at import time and served verbatim.
+SEARCH_PATIENT_PAGE = '''
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Search Patient</title>
+            <link rel="stylesheet" href="/static/forms.css">
+        </head>
+        <body>
+            <div class="nav">
+                <a href="/">← Back to Dashboard</a>
+            </div>
+            <div class="form">
+                <h2>Search Patient</h2>
+                <form method="POST" action="/search_patient">
+                    <div class="field">
+                        <label>Patient ID</label>
+                        <input type="text" name="patient_id" placeholder="Enter Patient ID (e.g., PAT000001)" required>
+                    </div>
+                    <button type="submit" class="btn">Search Patient</button>
+                </form>
+                <hr>
+                <div style="text-align: center;">
+                    <p>Or</p>
+                    <a href="/patients" class="btn" style="text-decoration: none; display: inline-block;">Browse All Patients</a>
                 </div>
             </div>
-            
-            <div class="actions">
-                <h3>Quick Actions</h3>
-                <a href="/register_patient" class="btn">Register New Patient</a>
-                <a href="/search_patient" class="btn">Search Patient</a>
-                <a href="/add_location" class="btn">Add Location</a>
+        </body>
+        </html>
+        '''.encode('utf-8')
+
+ADD_LOCATION_PAGE = '''
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Add Location</title>
+            <link rel="stylesheet" href="/static/forms.css">
+        </head>
+        <body>
+            <div class="nav">
+                <a href="/">← Dashboard</a> | <a href="/locations">Locations</a>
             </div>
-            
-            <div class="recent">
-                <h3>Recent Patients</h3>
-                {''.join([f'<p><a href="/patient/{p[1]}">{p[2]} {p[3]} ({p[1]})</a> - {p[-1]}</p>' for p in recent_patients]) if recent_patients else '<p>No patients registered yet.</p>'}
+            <div class="form">
+                <h2>Add New Location</h2>
+                <form method="POST" action="/add_location">
+                    <div class="field">
+                        <label>Location Name *</label>
+                        <input type="text" name="name" required>
+                    </div>
+                    <div class="field">
+                        <label>Address</label>
+                        <textarea name="address" rows="3"></textarea>
+                    </div>
+                    <div class="field">
+                        <label>Phone</label>
+                        <input type="tel" name="phone">
+                    </div>
+                    <button type="submit" class="btn">Add Location</button>
+                </form>
             </div>
         </body>
         </html>
-        '''
-        self.send_html_response(html)
-    
-    def send_register_patient_form(self):
-        """Send patient registration form"""
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, name FROM locations')
-        locations = cursor.fetchall()
-        conn.close()
-        
-        location_options = ''.join([f'<option value="{loc[0]}">{loc[1]}</option>' for loc in locations])
-        
-        html = f'''
+        '''.encode('utf-8')
+
+# Dynamic form skeletons, parsed into string.Template once at import so a
+# request only substitutes the handful of per-page fields. Values passed
+# in must already be HTML-escaped.
+REGISTER_PATIENT_FORM = Template('''
         <!DOCTYPE html>
         <html>
         <head>
             <title>Register Patient</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .form {{ max-width: 600px; margin: 0 auto; }}
-                .field {{ margin: 15px 0; }}
-                label {{ display: block; margin-bottom: 5px; font-weight: bold; }}
-                input, select, textarea {{ width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 3px; }}
-                .btn {{ background: #007bff; color: white; padding: 10px 20px; border: none; border-radius: 3px; cursor: pointer; }}
-                .btn:hover {{ background: #0056b3; }}
-                .nav {{ margin-bottom: 20px; }}
-                .nav a {{ color: #007bff; text-decoration: none; margin-right: 10px; }}
-            </style>
+            <link rel="stylesheet" href="/static/forms.css">
         </head>
         <body>
             <div class="nav">
@@ -354,7 +360,7 @@ class DemographicHandler(http.server.SimpleHTTPRequestHandler):
                         <label>Registration Location *</label>
                         <select name="location_id" required>
                             <option value="">Select Location</option>
-                            {location_options}
+                            $location_options
                         </select>
                     </div>
                     <button type="submit" class="btn">Register Patient</button>
@@ -362,484 +368,30 @@ class DemographicHandler(http.server.SimpleHTTPRequestHandler):
             </div>
         </body>
         </html>
-        '''
-        self.send_html_response(html)
-    
-    def handle_register_patient(self, data):
-        """Handle patient registration"""
-        try:
-            patient_id = generate_patient_id()
-            
-            conn = sqlite3.connect(DATABASE)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO patients 
-                (patient_id, first_name, last_name, date_of_birth, gender, phone, email, address, emergency_contact, location_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                patient_id,
-                data['first_name'][0],
-                data['last_name'][0],
-                data['date_of_birth'][0],
-                data['gender'][0],
-                data['phone'][0],
-                data.get('email', [''])[0],
-                data.get('address', [''])[0],
-                data.get('emergency_contact', [''])[0],
-                data['location_id'][0]
-            ))
-            conn.commit()
-            conn.close()
-            
-            # Redirect to patient details
-            self.send_response(302)
-            self.send_header('Location', f'/patient/{patient_id}')
-            self.end_headers()
-            
-        except Exception as e:
-            self.send_error(500, f"Registration failed: {str(e)}")
-    
-    def send_patient_details(self, patient_id):
-        """Send patient details page"""
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
-        # Get patient info
-        cursor.execute('''
-            SELECT p.*, l.name as location_name FROM patients p
-            JOIN locations l ON p.location_id = l.id
-            WHERE p.patient_id = ?
-        ''', (patient_id,))
-        patient = cursor.fetchone()
-        
-        if not patient:
-            self.send_error(404, "Patient not found")
-            return
-        
-        # Get health records
-        cursor.execute('''
-            SELECT hr.*, l.name as location_name FROM health_records hr
-            JOIN locations l ON hr.location_id = l.id
-            WHERE hr.patient_id = ?
-            ORDER BY hr.recorded_at DESC
-        ''', (patient[0],))
-        health_records = cursor.fetchall()
-        
-        # Get blood samples
-        cursor.execute('''
-            SELECT bs.*, cl.name as collection_location, tl.name as test_location 
-            FROM blood_samples bs
-            JOIN locations cl ON bs.collection_location_id = cl.id
-            LEFT JOIN locations tl ON bs.test_location_id = tl.id
-            WHERE bs.patient_id = ?
-            ORDER BY bs.collected_at DESC
-        ''', (patient[0],))
-        blood_samples = cursor.fetchall()
-        
-        conn.close()
-        
-        # Generate simple QR code placeholder
-        qr_code = generate_qr_code_simple(patient_id)
-        
-        health_records_html = ''
-        if health_records:
-            health_records_html = '<h3>Health Records</h3><table border="1" style="width:100%; border-collapse: collapse;">'
-            health_records_html += '<tr><th>Date</th><th>Location</th><th>Height</th><th>Weight</th><th>Temperature</th><th>BP</th><th>Heart Rate</th><th>Recorded By</th></tr>'
-            for record in health_records:
-                bp = f"{record[5]}/{record[6]}" if record[5] and record[6] else "-"
-                health_records_html += f'<tr><td>{record[11]}</td><td>{record[-1]}</td><td>{record[3] or "-"}</td><td>{record[4] or "-"}</td><td>{record[5] or "-"}</td><td>{bp}</td><td>{record[7] or "-"}</td><td>{record[9]}</td></tr>'
-            health_records_html += '</table>'
-        
-        blood_samples_html = ''
-        if blood_samples:
-            blood_samples_html = '<h3>Blood Samples</h3><table border="1" style="width:100%; border-collapse: collapse;">'
-            blood_samples_html += '<tr><th>Sample ID</th><th>Test Type</th><th>Status</th><th>Collection Date</th><th>Actions</th></tr>'
-            for sample in blood_samples:
-                action = ""
-                if sample[8] == 'collected':
-                    action = f'<a href="/update_test_results/{sample[1]}">Update Results</a>'
-                elif sample[8] == 'tested':
-                    action = f'<a href="/send_results/{sample[1]}">Send Results</a>'
-                blood_samples_html += f'<tr><td>{sample[1]}</td><td>{sample[7]}</td><td>{sample[8]}</td><td>{sample[6]}</td><td>{action}</td></tr>'
-            blood_samples_html += '</table>'
-        
-        html = f'''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Patient Details - {patient[2]} {patient[3]}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .patient-info {{ background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 20px; }}
-                .actions {{ margin: 20px 0; }}
-                .btn {{ background: #007bff; color: white; padding: 10px 15px; text-decoration: none; border-radius: 3px; margin-right: 10px; }}
-                .btn:hover {{ background: #0056b3; }}
-                table {{ margin: 20px 0; }}
-                th, td {{ padding: 8px; text-align: left; }}
-                .nav {{ margin-bottom: 20px; }}
-                .nav a {{ color: #007bff; text-decoration: none; margin-right: 10px; }}
-                .qr {{ background: #e9ecef; padding: 20px; text-align: center; margin: 20px 0; }}
-            </style>
-        </head>
-        <body>
-            <div class="nav">
-                <a href="/">← Dashboard</a> | <a href="/patients">Patients</a>
-            </div>
-            
-            <div class="patient-info">
-                <h2>Patient Details - {patient[1]}</h2>
-                <p><strong>Name:</strong> {patient[2]} {patient[3]}</p>
-                <p><strong>Date of Birth:</strong> {patient[4]}</p>
-                <p><strong>Gender:</strong> {patient[5]}</p>
-                <p><strong>Phone:</strong> {patient[6]}</p>
-                <p><strong>Email:</strong> {patient[7] or 'N/A'}</p>
-                <p><strong>Address:</strong> {patient[8] or 'N/A'}</p>
-                <p><strong>Emergency Contact:</strong> {patient[9] or 'N/A'}</p>
-                <p><strong>Registered at:</strong> {patient[-1]}</p>
-            </div>
-            
-            <div class="qr">
-                <h4>Patient QR Code</h4>
-                <p>{qr_code}</p>
-                <small>Use this to quickly access patient information</small>
-            </div>
-            
-            <div class="actions">
-                <a href="/add_health_record/{patient[1]}" class="btn">Add Health Record</a>
-                <a href="/collect_blood_sample/{patient[1]}" class="btn">Collect Blood Sample</a>
-            </div>
-            
-            {health_records_html}
-            {blood_samples_html}
-        </body>
-        </html>
-        '''
-        self.send_html_response(html)
-    
-    def send_patients_list(self):
-        """Send patients list page"""
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT p.*, l.name as location_name FROM patients p
-            JOIN locations l ON p.location_id = l.id
-            ORDER BY p.created_at DESC
-        ''')
-        patients = cursor.fetchall()
-        conn.close()
-        
-        patients_html = ''
-        if patients:
-            patients_html = '<table border="1" style="width:100%; border-collapse: collapse;">'
-            patients_html += '<tr><th>Patient ID</th><th>Name</th><th>DOB</th><th>Gender</th><th>Phone</th><th>Location</th><th>Actions</th></tr>'
-            for patient in patients:
-                patients_html += f'<tr><td>{patient[1]}</td><td>{patient[2]} {patient[3]}</td><td>{patient[4]}</td><td>{patient[5]}</td><td>{patient[6]}</td><td>{patient[-1]}</td><td><a href="/patient/{patient[1]}">View</a></td></tr>'
-            patients_html += '</table>'
-        else:
-            patients_html = '<p>No patients registered yet.</p>'
-        
-        html = f'''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Patients</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .nav {{ margin-bottom: 20px; }}
-                .nav a {{ color: #007bff; text-decoration: none; margin-right: 10px; }}
-                .btn {{ background: #007bff; color: white; padding: 10px 15px; text-decoration: none; border-radius: 3px; }}
-                .btn:hover {{ background: #0056b3; }}
-                table {{ margin: 20px 0; }}
-                th, td {{ padding: 8px; text-align: left; }}
-            </style>
-        </head>
-        <body>
-            <div class="nav">
-                <a href="/">← Dashboard</a>
-            </div>
-            <h2>Patients</h2>
-            <a href="/register_patient" class="btn">Register New Patient</a>
-            {patients_html}
-        </body>
-        </html>
-        '''
-        self.send_html_response(html)
-    
-    def send_locations_list(self):
-        """Send locations list page"""
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM locations ORDER BY created_at DESC')
-        locations = cursor.fetchall()
-        conn.close()
-        
-        locations_html = ''
-        if locations:
-            locations_html = '<table border="1" style="width:100%; border-collapse: collapse;">'
-            locations_html += '<tr><th>Name</th><th>Address</th><th>Phone</th><th>Created</th></tr>'
-            for location in locations:
-                locations_html += f'<tr><td>{location[1]}</td><td>{location[2] or "N/A"}</td><td>{location[3] or "N/A"}</td><td>{location[4]}</td></tr>'
-            locations_html += '</table>'
-        else:
-            locations_html = '<p>No locations added yet.</p>'
-        
-        html = f'''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Locations</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .nav {{ margin-bottom: 20px; }}
-                .nav a {{ color: #007bff; text-decoration: none; margin-right: 10px; }}
-                .btn {{ background: #007bff; color: white; padding: 10px 15px; text-decoration: none; border-radius: 3px; }}
-                .btn:hover {{ background: #0056b3; }}
-                table {{ margin: 20px 0; }}
-                th, td {{ padding: 8px; text-align: left; }}
-            </style>
-        </head>
-        <body>
-            <div class="nav">
-                <a href="/">← Dashboard</a>
-            </div>
-            <h2>Locations</h2>
-            <a href="/add_location" class="btn">Add Location</a>
-            {locations_html}
-        </body>
-        </html>
-        '''
-        self.send_html_response(html)
-    
-    def send_blood_samples_list(self):
-        """Send blood samples list page"""
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT bs.*, p.first_name, p.last_name, p.patient_id, cl.name as collection_location 
-            FROM blood_samples bs
-            JOIN patients p ON bs.patient_id = p.id
-            JOIN locations cl ON bs.collection_location_id = cl.id
-            ORDER BY bs.collected_at DESC
         ''')
-        samples = cursor.fetchall()
-        conn.close()
-        
-        samples_html = ''
-        if samples:
-            samples_html = '<table border="1" style="width:100%; border-collapse: collapse;">'
-            samples_html += '<tr><th>Sample ID</th><th>Patient</th><th>Test Type</th><th>Status</th><th>Collection Date</th><th>Actions</th></tr>'
-            for sample in samples:
-                action = ""
-                if sample[8] == 'collected':
-                    action = f'<form method="POST" action="/update_test_results/{sample[1]}" style="display:inline;"><button type="submit">Update Results</button></form>'
-                elif sample[8] == 'tested':
-                    action = f'<a href="/send_results/{sample[1]}" style="background: #28a745; color: white; padding: 5px 10px; text-decoration: none; border-radius: 3px;">Send Results</a>'
-                samples_html += f'<tr><td>{sample[1]}</td><td><a href="/patient/{sample[-2]}">{sample[-4]} {sample[-3]} ({sample[-2]})</a></td><td>{sample[7]}</td><td>{sample[8]}</td><td>{sample[6]}</td><td>{action}</td></tr>'
-            samples_html += '</table>'
-        else:
-            samples_html = '<p>No blood samples collected yet.</p>'
-        
-        html = f'''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Blood Samples</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .nav {{ margin-bottom: 20px; }}
-                .nav a {{ color: #007bff; text-decoration: none; margin-right: 10px; }}
-                table {{ margin: 20px 0; }}
-                th, td {{ padding: 8px; text-align: left; }}
-                button {{ background: #007bff; color: white; padding: 5px 10px; border: none; border-radius: 3px; cursor: pointer; }}
-                button:hover {{ background: #0056b3; }}
-            </style>
-        </head>
-        <body>
-            <div class="nav">
-                <a href="/">← Dashboard</a>
-            </div>
-            <h2>Blood Samples</h2>
-            {samples_html}
-        </body>
-        </html>
-        '''
-        self.send_html_response(html)
-    
-    def send_search_patient_form(self):
-        """Send search patient form"""
-        html = '''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Search Patient</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 20px; }
-                .form { max-width: 400px; margin: 0 auto; }
-                .field { margin: 15px 0; }
-                label { display: block; margin-bottom: 5px; font-weight: bold; }
-                input { width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 3px; }
-                .btn { background: #007bff; color: white; padding: 10px 20px; border: none; border-radius: 3px; cursor: pointer; width: 100%; }
-                .btn:hover { background: #0056b3; }
-                .nav { margin-bottom: 20px; }
-                .nav a { color: #007bff; text-decoration: none; margin-right: 10px; }
-            </style>
-        </head>
-        <body>
-            <div class="nav">
-                <a href="/">← Back to Dashboard</a>
-            </div>
-            <div class="form">
-                <h2>Search Patient</h2>
-                <form method="POST" action="/search_patient">
-                    <div class="field">
-                        <label>Patient ID</label>
-                        <input type="text" name="patient_id" placeholder="Enter Patient ID (e.g., PAT000001)" required>
-                    </div>
-                    <button type="submit" class="btn">Search Patient</button>
-                </form>
-                <hr>
-                <div style="text-align: center;">
-                    <p>Or</p>
-                    <a href="/patients" class="btn" style="text-decoration: none; display: inline-block;">Browse All Patients</a>
-                </div>
-            </div>
-        </body>
-        </html>
-        '''
-        self.send_html_response(html)
-    
-    def send_add_location_form(self):
-        """Send add location form"""
-        html = '''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Add Location</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 20px; }
-                .form { max-width: 400px; margin: 0 auto; }
-                .field { margin: 15px 0; }
-                label { display: block; margin-bottom: 5px; font-weight: bold; }
-                input, textarea { width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 3px; }
-                .btn { background: #007bff; color: white; padding: 10px 20px; border: none; border-radius: 3px; cursor: pointer; }
-                .btn:hover { background: #0056b3; }
-                .nav { margin-bottom: 20px; }
-                .nav a { color: #007bff; text-decoration: none; margin-right: 10px; }
-            </style>
-        </head>
-        <body>
-            <div class="nav">
-                <a href="/">← Dashboard</a> | <a href="/locations">Locations</a>
-            </div>
-            <div class="form">
-                <h2>Add New Location</h2>
-                <form method="POST" action="/add_location">
-                    <div class="field">
-                        <label>Location Name *</label>
-                        <input type="text" name="name" required>
-                    </div>
-                    <div class="field">
-                        <label>Address</label>
-                        <textarea name="address" rows="3"></textarea>
-                    </div>
-                    <div class="field">
-                        <label>Phone</label>
-                        <input type="tel" name="phone">
-                    </div>
-                    <button type="submit" class="btn">Add Location</button>
-                </form>
-            </div>
-        </body>
-        </html>
-        '''
-        self.send_html_response(html)
-    
-    def handle_search_patient(self, data):
-        """Handle patient search"""
-        patient_id = data['patient_id'][0].strip().upper()
-        # Redirect to patient details
-        self.send_response(302)
-        self.send_header('Location', f'/patient/{patient_id}')
-        self.end_headers()
-    
-    def handle_add_location(self, data):
-        """Handle adding a new location"""
-        try:
-            conn = sqlite3.connect(DATABASE)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO locations (name, address, phone)
-                VALUES (?, ?, ?)
-            ''', (
-                data['name'][0],
-                data.get('address', [''])[0],
-                data.get('phone', [''])[0]
-            ))
-            conn.commit()
-            conn.close()
-            
-            # Redirect to locations list
-            self.send_response(302)
-            self.send_header('Location', '/locations')
-            self.end_headers()
-            
-        except Exception as e:
-            self.send_error(500, f"Failed to add location: {str(e)}")
-    
-    def send_add_health_record_form(self, patient_id):
-        """Send add health record form"""
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
-        # Get patient info
-        cursor.execute('SELECT * FROM patients WHERE patient_id = ?', (patient_id,))
-        patient = cursor.fetchone()
-        
-        if not patient:
-            self.send_error(404, "Patient not found")
-            return
-        
-        # Get locations
-        cursor.execute('SELECT id, name FROM locations')
-        locations = cursor.fetchall()
-        conn.close()
-        
-        location_options = ''.join([f'<option value="{loc[0]}">{loc[1]}</option>' for loc in locations])
-        
-        html = f'''
+
+ADD_HEALTH_RECORD_FORM = Template('''
         <!DOCTYPE html>
         <html>
         <head>
             <title>Add Health Record</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .form {{ max-width: 600px; margin: 0 auto; }}
-                .field {{ margin: 15px 0; }}
-                label {{ display: block; margin-bottom: 5px; font-weight: bold; }}
-                input, select, textarea {{ width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 3px; }}
-                .btn {{ background: #007bff; color: white; padding: 10px 20px; border: none; border-radius: 3px; cursor: pointer; }}
-                .btn:hover {{ background: #0056b3; }}
-                .nav {{ margin-bottom: 20px; }}
-                .nav a {{ color: #007bff; text-decoration: none; margin-right: 10px; }}
-                .row {{ display: flex; gap: 20px; }}
-                .col {{ flex: 1; }}
-            </style>
+            <link rel="stylesheet" href="/static/forms.css">
         </head>
         <body>
             <div class="nav">
-                <a href="/patient/{patient_id}">← Back to Patient</a>
+                <a href="/patient/$patient_id">← Back to Patient</a>
             </div>
             <div class="form">
                 <h2>Add Health Record</h2>
-                <p><strong>Patient:</strong> {patient[2]} {patient[3]} ({patient[1]})</p>
-                <form method="POST" action="/add_health_record/{patient_id}">
+                <p><strong>Patient:</strong> $patient_name</p>
+                <form method="POST" action="/add_health_record/$patient_id">
                     <div class="row">
                         <div class="col">
                             <div class="field">
                                 <label>Current Location *</label>
                                 <select name="location_id" required>
                                     <option value="">Select Location</option>
-                                    {location_options}
+                                    $location_options
                                 </select>
                             </div>
                         </div>
@@ -903,102 +455,28 @@ class DemographicHandler(http.server.SimpleHTTPRequestHandler):
             </div>
         </body>
         </html>
-        '''
-        self.send_html_response(html)
-    
-    def handle_add_health_record(self, patient_id, data):
-        """Handle adding health record"""
-        try:
-            conn = sqlite3.connect(DATABASE)
-            cursor = conn.cursor()
-            
-            # Get patient internal ID
-            cursor.execute('SELECT id FROM patients WHERE patient_id = ?', (patient_id,))
-            patient = cursor.fetchone()
-            
-            if not patient:
-                self.send_error(404, "Patient not found")
-                return
-            
-            cursor.execute('''
-                INSERT INTO health_records 
-                (patient_id, location_id, height, weight, temperature, blood_pressure_systolic, 
-                 blood_pressure_diastolic, heart_rate, notes, recorded_by)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                patient[0],
-                data['location_id'][0],
-                float(data['height'][0]) if data.get('height', [''])[0] else None,
-                float(data['weight'][0]) if data.get('weight', [''])[0] else None,
-                float(data['temperature'][0]) if data.get('temperature', [''])[0] else None,
-                int(data['bp_systolic'][0]) if data.get('bp_systolic', [''])[0] else None,
-                int(data['bp_diastolic'][0]) if data.get('bp_diastolic', [''])[0] else None,
-                int(data['heart_rate'][0]) if data.get('heart_rate', [''])[0] else None,
-                data.get('notes', [''])[0],
-                data['recorded_by'][0]
-            ))
-            conn.commit()
-            conn.close()
-            
-            # Redirect back to patient details
-            self.send_response(302)
-            self.send_header('Location', f'/patient/{patient_id}')
-            self.end_headers()
-            
-        except Exception as e:
-            self.send_error(500, f"Failed to add health record: {str(e)}")
-    
-    def send_collect_blood_sample_form(self, patient_id):
-        """Send collect blood sample form"""
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
-        # Get patient info
-        cursor.execute('SELECT * FROM patients WHERE patient_id = ?', (patient_id,))
-        patient = cursor.fetchone()
-        
-        if not patient:
-            self.send_error(404, "Patient not found")
-            return
-        
-        # Get locations
-        cursor.execute('SELECT id, name FROM locations')
-        locations = cursor.fetchall()
-        conn.close()
-        
-        location_options = ''.join([f'<option value="{loc[0]}">{loc[1]}</option>' for loc in locations])
-        
-        html = f'''
+        ''')
+
+COLLECT_SAMPLE_FORM = Template('''
         <!DOCTYPE html>
         <html>
         <head>
             <title>Collect Blood Sample</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .form {{ max-width: 500px; margin: 0 auto; }}
-                .field {{ margin: 15px 0; }}
-                label {{ display: block; margin-bottom: 5px; font-weight: bold; }}
-                input, select {{ width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 3px; }}
-                .btn {{ background: #28a745; color: white; padding: 10px 20px; border: none; border-radius: 3px; cursor: pointer; }}
-                .btn:hover {{ background: #218838; }}
-                .nav {{ margin-bottom: 20px; }}
-                .nav a {{ color: #007bff; text-decoration: none; margin-right: 10px; }}
-                .alert {{ background: #d1ecf1; border: 1px solid #bee5eb; padding: 15px; border-radius: 3px; margin: 15px 0; }}
-            </style>
+            <link rel="stylesheet" href="/static/forms.css">
         </head>
         <body>
             <div class="nav">
-                <a href="/patient/{patient_id}">← Back to Patient</a>
+                <a href="/patient/$patient_id">← Back to Patient</a>
             </div>
             <div class="form">
                 <h2>Collect Blood Sample</h2>
-                <p><strong>Patient:</strong> {patient[2]} {patient[3]} ({patient[1]})</p>
-                <form method="POST" action="/collect_blood_sample/{patient_id}">
+                <p><strong>Patient:</strong> $patient_name</p>
+                <form method="POST" action="/collect_blood_sample/$patient_id">
                     <div class="field">
                         <label>Collection Location *</label>
                         <select name="collection_location_id" required>
                             <option value="">Select Location</option>
-                            {location_options}
+                            $location_options
                         </select>
                     </div>
                     
@@ -1028,96 +506,19 @@ class DemographicHandler(http.server.SimpleHTTPRequestHandler):
                         The sample will be flagged for testing and can be processed at any location.
                     </div>
                     
-                    <button type="submit" class="btn">Collect Sample</button>
+                    <button type="submit" class="btn btn-green">Collect Sample</button>
                 </form>
             </div>
         </body>
         </html>
-        '''
-        self.send_html_response(html)
-    
-    def handle_collect_blood_sample(self, patient_id, data):
-        """Handle blood sample collection"""
-        try:
-            conn = sqlite3.connect(DATABASE)
-            cursor = conn.cursor()
-            
-            # Get patient internal ID
-            cursor.execute('SELECT id FROM patients WHERE patient_id = ?', (patient_id,))
-            patient = cursor.fetchone()
-            
-            if not patient:
-                self.send_error(404, "Patient not found")
-                return
-            
-            sample_id = generate_sample_id()
-            
-            cursor.execute('''
-                INSERT INTO blood_samples 
-                (sample_id, patient_id, collection_location_id, test_type, collected_by, status)
-                VALUES (?, ?, ?, ?, ?, 'collected')
-            ''', (
-                sample_id,
-                patient[0],
-                data['collection_location_id'][0],
-                data['test_type'][0],
-                data['collected_by'][0]
-            ))
-            conn.commit()
-            conn.close()
-            
-            # Redirect back to patient details
-            self.send_response(302)
-            self.send_header('Location', f'/patient/{patient_id}')
-            self.end_headers()
-            
-        except Exception as e:
-            self.send_error(500, f"Failed to collect blood sample: {str(e)}")
-    
-    def send_update_test_results_form(self, sample_id):
-        """Send update test results form"""
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
-        # Get sample info
-        cursor.execute('''
-            SELECT bs.*, p.first_name, p.last_name, p.patient_id 
-            FROM blood_samples bs
-            JOIN patients p ON bs.patient_id = p.id
-            WHERE bs.sample_id = ?
-        ''', (sample_id,))
-        sample = cursor.fetchone()
-        
-        if not sample:
-            self.send_error(404, "Sample not found")
-            return
-        
-        # Get locations
-        cursor.execute('SELECT id, name FROM locations')
-        locations = cursor.fetchall()
-        conn.close()
-        
-        location_options = ''.join([f'<option value="{loc[0]}">{loc[1]}</option>' for loc in locations])
-        
-        html = f'''
+        ''')
+
+UPDATE_RESULTS_FORM = Template('''
         <!DOCTYPE html>
         <html>
         <head>
             <title>Update Test Results</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .form {{ max-width: 600px; margin: 0 auto; }}
-                .field {{ margin: 15px 0; }}
-                label {{ display: block; margin-bottom: 5px; font-weight: bold; }}
-                input, select, textarea {{ width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 3px; }}
-                .btn {{ background: #007bff; color: white; padding: 10px 20px; border: none; border-radius: 3px; cursor: pointer; }}
-                .btn:hover {{ background: #0056b3; }}
-                .nav {{ margin-bottom: 20px; }}
-                .nav a {{ color: #007bff; text-decoration: none; margin-right: 10px; }}
-                .row {{ display: flex; gap: 20px; }}
-                .col {{ flex: 1; }}
-                .alert {{ background: #d1ecf1; border: 1px solid #bee5eb; padding: 15px; border-radius: 3px; margin: 15px 0; }}
-            </style>
+            <link rel="stylesheet" href="/static/forms.css">
         </head>
         <body>
             <div class="nav">
@@ -1125,31 +526,31 @@ class DemographicHandler(http.server.SimpleHTTPRequestHandler):
             </div>
             <div class="form">
                 <h2>Update Test Results</h2>
-                <p><strong>Sample ID:</strong> {sample[1]}</p>
-                <p><strong>Patient:</strong> {sample[-3]} {sample[-2]} ({sample[-1]})</p>
-                <p><strong>Test Type:</strong> {sample[7]}</p>
-                <form method="POST" action="/update_test_results/{sample_id}">
+                <p><strong>Sample ID:</strong> $sample_id</p>
+                <p><strong>Patient:</strong> $patient_name</p>
+                <p><strong>Test Type:</strong> $test_type</p>
+                <form method="POST" action="/update_test_results/$sample_id">
                     <div class="row">
                         <div class="col">
                             <div class="field">
                                 <label>Test Location *</label>
                                 <select name="test_location_id" required>
                                     <option value="">Select Location</option>
-                                    {location_options}
+                                    $location_options
                                 </select>
                             </div>
                         </div>
                         <div class="col">
                             <div class="field">
                                 <label>Tested By *</label>
-                                <input type="text" name="tested_by" required value="{sample[10] or ''}">
+                                <input type="text" name="tested_by" required value="$tested_by">
                             </div>
                         </div>
                     </div>
                     
                     <div class="field">
                         <label>Test Results *</label>
-                        <textarea name="results" rows="10" required>{sample[9] or ''}</textarea>
+                        <textarea name="results" rows="10" required>$results</textarea>
                     </div>
                     
                     <div class="alert">
@@ -1161,106 +562,1330 @@ class DemographicHandler(http.server.SimpleHTTPRequestHandler):
             </div>
         </body>
         </html>
+        ''')
+
+LOCATIONS_LIST_HEAD = '''
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Locations</title>
+            <style>
+                body { font-family: Arial, sans-serif; margin: 20px; }
+                .nav { margin-bottom: 20px; }
+                .nav a { color: #007bff; text-decoration: none; margin-right: 10px; }
+                .btn { background: #007bff; color: white; padding: 10px 15px; text-decoration: none; border-radius: 3px; }
+                .btn:hover { background: #0056b3; }
+                table { margin: 20px 0; }
+                th, td { padding: 8px; text-align: left; }
+            </style>
+        </head>
+        <body>
+            <div class="nav">
+                <a href="/">&larr; Dashboard</a>
+            </div>
+            <h2>Locations</h2>
+            <a href="/add_location" class="btn">Add Location</a>
+'''.encode('utf-8')
+
+LOCATIONS_TABLE_OPEN = ('<table border="1" style="width:100%; border-collapse: collapse;">'
+                        '<tr><th>Name</th><th>Address</th><th>Phone</th><th>Created</th></tr>').encode('utf-8')
+
+SAMPLES_LIST_HEAD = '''
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Blood Samples</title>
+            <style>
+                body { font-family: Arial, sans-serif; margin: 20px; }
+                .nav { margin-bottom: 20px; }
+                .nav a { color: #007bff; text-decoration: none; margin-right: 10px; }
+                table { margin: 20px 0; }
+                th, td { padding: 8px; text-align: left; }
+                button { background: #007bff; color: white; padding: 5px 10px; border: none; border-radius: 3px; cursor: pointer; }
+                button:hover { background: #0056b3; }
+            </style>
+        </head>
+        <body>
+            <div class="nav">
+                <a href="/">&larr; Dashboard</a>
+            </div>
+            <h2>Blood Samples</h2>
+'''.encode('utf-8')
+
+SAMPLES_TABLE_OPEN = ('<table border="1" style="width:100%; border-collapse: collapse;">'
+                      '<tr><th>Sample ID</th><th>Patient</th><th>Test Type</th><th>Status</th>'
+                      '<th>Collection Date</th><th>Actions</th></tr>').encode('utf-8')
+
+# Per-row HTML templates for the list pages. %-formatting against a
+# premade template string is cheaper in a loop than rebuilding an f-string
+# per row, and keeps the row markup in one place.
+ROW_RECENT_PATIENT = '<p><a href="/patient/%s">%s %s (%s)</a> - %s</p>'
+ROW_PATIENT = ('<tr><td>%s</td><td>%s %s</td><td>%s</td><td>%s</td>'
+               '<td>%s</td><td>%s</td><td><a href="/patient/%s">View</a></td></tr>')
+ROW_LOCATION = '<tr><td>%s</td><td>%s</td><td>%s</td><td>%s</td></tr>'
+ROW_SAMPLE = ('<tr><td>%s</td><td><a href="/patient/%s">%s %s (%s)</a></td>'
+              '<td>%s</td><td>%s</td><td>%s</td><td>%s</td></tr>')
+ROW_HEALTH_RECORD = ('<tr><td>%s</td><td>%s</td><td>%s</td><td>%s</td>'
+                     '<td>%s</td><td>%s</td><td>%s</td><td>%s</td></tr>')
+ROW_PATIENT_SAMPLE = '<tr><td>%s</td><td>%s</td><td>%s</td><td>%s</td><td>%s</td></tr>'
+
+# WhatsApp notification body. Parsed once at import time; per send we
+# only pay the placeholder substitution instead of re-building the
+# multi-line literal.
+WHATSAPP_MESSAGE = Template('''
+🏥 MEDICAL TEST RESULTS 🏥
+
+Patient: $first_name $last_name
+Patient ID: $patient_code
+Sample ID: $sample_id
+Test Type: $test_type
+
+Results:
+$results
+
+Tested by: $tested_by
+Test Date: $tested_at
+
+For questions, please contact your healthcare provider.
+                ''')
+
+@lru_cache(maxsize=4096)
+def _esc(value):
+    """html.escape memoized for values that repeat across renders.
+
+    Names, locations and statuses recur constantly in the list and
+    detail pages; a cache hit replaces the character scan with a dict
+    lookup.
+    """
+    return E(value)
+
+def _e(template, values):
+    """%-format a row template with every value HTML-escaped"""
+    return template % tuple(_esc(str(v)) for v in values)
+
+# Connection pool: one long-lived connection per thread so the SQLite page
+# cache stays warm across requests instead of being rebuilt on every
+# sqlite3.connect() call.
+_local = threading.local()
+
+def _configure_connection(conn):
+    """Apply performance pragmas to a freshly opened connection"""
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA cache_size=-64000')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    # Checkpoint the WAL back into the main db once it reaches ~4 MB so
+    # it cannot grow unbounded between the periodic checkpoints
+    conn.execute('PRAGMA wal_autocheckpoint=1000')
+    # Read db pages through mmap instead of read(2) into the page cache
+    conn.execute('PRAGMA mmap_size=134217728')
+    # The schema declares FOREIGN KEY constraints; enforcement is off by
+    # default and per-connection, so switch it on here
+    conn.execute('PRAGMA foreign_keys=ON')
+    # Named column access in handlers; sqlite3.Row is C-implemented and
+    # costs nothing over plain tuples
+    conn.row_factory = sqlite3.Row
+
+@contextmanager
+def get_conn():
+    """Yield this thread's cached connection, creating it on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'database', None) != DATABASE:
+        if conn is not None:
+            conn.close()
+        # 512 cached statements comfortably covers every hoisted SQL_*
+        # constant times the trigger/ANALYZE variants SQLite prepares
+        # internally, so no hot statement ever falls out of the cache
+        conn = sqlite3.connect(DATABASE, check_same_thread=False,
+                               cached_statements=512,
+                               uri=DATABASE.startswith('file:'))
+        _configure_connection(conn)
+        _local.conn = conn
+        _local.database = DATABASE
+    yield conn
+
+# Rendered <option> markup for the locations dropdowns. Locations change
+# far less often than the forms that embed them are loaded, so the joined
+# string is cached and only rebuilt after a location is added.
+# Monotonic data-version counter, bumped by every write handler. Cached
+# pages key on it: a stale entry can never be served because any write
+# moves the version forward. It also doubles as the dashboard ETag.
+# The counter restarts at 0 with the process, so ETags mix in a per-boot
+# nonce: a client holding a page from a previous server lifetime can
+# never get a 304 for different data just because the counts coincide.
+_BOOT_NONCE = f'{os.getpid():x}.{time.time_ns():x}'
+_data_version = 0
+_data_version_lock = threading.Lock()
+
+def bump_data_version():
+    """Advance the version after a committed write"""
+    global _data_version
+    with _data_version_lock:
+        _data_version += 1
+
+# Dedicated connection for PRAGMA data_version reads, shared by all
+# threads behind a lock. Its data_version moves whenever any *other*
+# connection commits — including one in a sibling SO_REUSEPORT process —
+# which is exactly the signal the process-local counter cannot see.
+_version_conn = None
+_version_conn_db = None
+_version_conn_lock = threading.Lock()
+
+def _db_data_version():
+    """Read SQLite's data_version for the current DATABASE"""
+    global _version_conn, _version_conn_db
+    with _version_conn_lock:
+        if _version_conn is None or _version_conn_db != DATABASE:
+            if _version_conn is not None:
+                _version_conn.close()
+            _version_conn = sqlite3.connect(DATABASE, check_same_thread=False,
+                                            uri=DATABASE.startswith('file:'))
+            _version_conn_db = DATABASE
+        return _version_conn.execute('PRAGMA data_version').fetchone()[0]
+
+def current_data_version():
+    """Combined version token for caches and ETags.
+
+    The process-local counter covers this process's own writes (which
+    do not move its own data_version); the PRAGMA covers everyone
+    else's. Any committed write from any process changes the token.
+    """
+    return f'{_db_data_version()}.{_data_version}'
+
+_dashboard_cache = {'db': None, 'version': None, 'body': None}
+_dashboard_cache_lock = threading.Lock()
+
+_location_options_cache = {'db': None, 'version': None, 'html': None}
+_location_options_lock = threading.Lock()
+
+def get_location_options(cursor):
+    """Return the cached <option> markup for all locations.
+
+    Keyed on the combined version token as well, so a location added by
+    a sibling process shows up in this process's dropdowns.
+    """
+    version = current_data_version()
+    with _location_options_lock:
+        if (_location_options_cache['db'] != DATABASE
+                or _location_options_cache['version'] != version
+                or _location_options_cache['html'] is None):
+            cursor.execute(SQL_LOCATION_OPTIONS)
+            html = ''.join([f'<option value="{loc[0]}">{E(loc[1])}</option>'
+                            for loc in cursor.fetchall()])
+            _location_options_cache['db'] = DATABASE
+            _location_options_cache['version'] = version
+            _location_options_cache['html'] = html
+        return _location_options_cache['html']
+
+def invalidate_location_options():
+    """Drop the cached dropdown markup after locations change"""
+    with _location_options_lock:
+        _location_options_cache['html'] = None
+
+# Bump when the DDL below changes; init_database skips the bootstrap
+# entirely when the database already carries the current version.
+SCHEMA_VERSION = 2
+
+def init_database():
+    """Initialize the SQLite database with tables"""
+    # uri=True lets DATABASE point at file: URIs, e.g. the shared-cache
+    # in-memory database the test suite uses
+    conn = sqlite3.connect(DATABASE, uri=DATABASE.startswith('file:'))
+
+    # PRAGMA user_version is a free int stored in the database header;
+    # matching it means the DDL (and its exclusive lock) can be skipped
+    # on every warm start
+    if conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION:
+        conn.close()
+        return
+
+    # One executescript call runs the whole bootstrap in a single
+    # transaction: one fsync on first startup instead of one per
+    # statement. Indexes cover the hot filter/join columns; their column
+    # order matches the ORDER BY of the list queries so SQLite can skip
+    # the sort step.
+    conn.executescript("""
+        BEGIN;
+        CREATE TABLE IF NOT EXISTS locations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            address TEXT,
+            phone TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS patients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_id TEXT UNIQUE NOT NULL,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            date_of_birth DATE NOT NULL,
+            gender TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            email TEXT,
+            address TEXT,
+            emergency_contact TEXT,
+            location_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (location_id) REFERENCES locations (id)
+        );
+
+        CREATE TABLE IF NOT EXISTS health_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_id INTEGER NOT NULL,
+            location_id INTEGER NOT NULL,
+            height REAL,
+            weight REAL,
+            temperature REAL,
+            blood_pressure_systolic INTEGER,
+            blood_pressure_diastolic INTEGER,
+            heart_rate INTEGER,
+            notes TEXT,
+            recorded_by TEXT NOT NULL,
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (patient_id) REFERENCES patients (id),
+            FOREIGN KEY (location_id) REFERENCES locations (id)
+        );
+
+        CREATE TABLE IF NOT EXISTS blood_samples (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sample_id TEXT UNIQUE NOT NULL,
+            patient_id INTEGER NOT NULL,
+            collection_location_id INTEGER NOT NULL,
+            test_location_id INTEGER,
+            collected_by TEXT NOT NULL,
+            collected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            test_type TEXT NOT NULL,
+            status TEXT DEFAULT 'collected',
+            results TEXT,
+            tested_by TEXT,
+            tested_at TIMESTAMP,
+            results_sent_at TIMESTAMP,
+            FOREIGN KEY (patient_id) REFERENCES patients (id),
+            FOREIGN KEY (collection_location_id) REFERENCES locations (id),
+            FOREIGN KEY (test_location_id) REFERENCES locations (id)
+        );
+
+        -- patients.patient_id and blood_samples.sample_id are declared
+        -- UNIQUE above, which already gives them implicit B-tree indexes
+        -- (sqlite_autoindex_*), so the business-key lookups used by the
+        -- detail pages and search are O(log n) without further DDL.
+        CREATE INDEX IF NOT EXISTS idx_hr_patient_time
+        ON health_records(patient_id, recorded_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_bs_patient_time
+        ON blood_samples(patient_id, collected_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_bs_status ON blood_samples(status);
+        CREATE INDEX IF NOT EXISTS idx_patients_created ON patients(created_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_bs_location
+        ON blood_samples(collection_location_id);
+
+        -- Maintained counters so the dashboard reads one row instead of
+        -- counting; the triggers below keep pending_samples exact
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+
+        CREATE TRIGGER IF NOT EXISTS trg_bs_insert_pending
+        AFTER INSERT ON blood_samples WHEN new.status = 'collected'
+        BEGIN
+            UPDATE counters SET value = value + 1
+            WHERE name = 'pending_samples';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_bs_status_pending
+        AFTER UPDATE OF status ON blood_samples
+        WHEN old.status != new.status
+        BEGIN
+            UPDATE counters
+            SET value = value - (old.status = 'collected')
+                              + (new.status = 'collected')
+            WHERE name = 'pending_samples';
+        END;
+
+        -- Seed the default location on first run only
+        INSERT INTO locations (name, address, phone)
+        SELECT 'Main Hospital', '123 Healthcare Street, Medical City', '+1234567890'
+        WHERE NOT EXISTS (SELECT 1 FROM locations);
+
+        -- Backfill the counter from the real count when upgrading an
+        -- existing database
+        INSERT INTO counters (name, value)
+        SELECT 'pending_samples',
+               (SELECT COUNT(*) FROM blood_samples WHERE status = 'collected')
+        WHERE NOT EXISTS (SELECT 1 FROM counters WHERE name = 'pending_samples');
+        COMMIT;
+
+        -- Refresh planner statistics so the indexes above actually get
+        -- picked once tables grow
+        ANALYZE;
+
+        PRAGMA user_version = %d;
+    """ % SCHEMA_VERSION)
+    conn.close()
+
+def bulk_insert(cursor, sql, rows, chunk=50):
+    """executemany the rows in chunks, amortizing statement overhead.
+
+    Caller is responsible for wrapping the whole load in one
+    transaction; chunking just keeps the bound-parameter arrays at a
+    size SQLite handles well.
+    """
+    for i in range(0, len(rows), chunk):
+        cursor.executemany(sql, rows[i:i + chunk])
+
+def assign_patient_id(cursor):
+    """Derive the display ID from the rowid SQLite just assigned.
+
+    Must be called inside the transaction that inserted the row (with a
+    placeholder patient_id), so the UPDATE commits atomically with the
+    INSERT. The rowid is assigned atomically by SQLite, which makes the
+    derived ID race-free, unlike the old COUNT(*)+1 scheme.
+    """
+    patient_id = f"PAT{cursor.lastrowid:06d}"
+    cursor.execute(SQL_ASSIGN_PATIENT_ID, (patient_id, cursor.lastrowid))
+    return patient_id
+
+def assign_sample_id(cursor):
+    """Sample-ID counterpart of assign_patient_id"""
+    sample_id = f"BS{cursor.lastrowid:06d}"
+    cursor.execute(SQL_ASSIGN_SAMPLE_ID, (sample_id, cursor.lastrowid))
+    return sample_id
+
+try:  # optional dependency; see README "Optional Dependencies"
+    import qrcode
+except ImportError:
+    qrcode = None
+
+@lru_cache(maxsize=4096)
+def _qr_png(data):
+    """Render the QR symbol for data as PNG bytes, cached per value.
+
+    Patient IDs never change, so after the first render a QR request
+    costs one dict lookup and one socket write.
+    """
+    img = qrcode.make(data)
+    buf = BytesIO()
+    img.save(buf, format='PNG')
+    return buf.getvalue()
+
+@lru_cache(maxsize=4096)
+def generate_qr_code_simple(data):
+    """Generate QR markup for a patient ID, cached per ID.
+
+    With the optional qrcode library installed this points at the
+    /qr/<id>.png endpoint, keeping the image bytes out of the HTML and
+    letting the browser cache them; without it, the old text
+    placeholder.
+    """
+    if qrcode is None:
+        return f"QR:{data}"
+    return f'<img src="/qr/{data}.png" alt="QR:{data}" width="160" height="160">'
+
+def simulate_whatsapp_send(phone, message):
+    """Simulate WhatsApp message sending"""
+    print(f"[WhatsApp Simulation] Sending to {phone}:")
+    print(f"Message: {message}")
+    return True
+
+# Outbound WhatsApp messages are sent by a background worker so the HTTP
+# thread only enqueues and redirects; in production the send is a network
+# round-trip that should never block a request.
+_send_queue = queue.Queue()
+_send_worker_lock = threading.Lock()
+_send_worker = None
+
+def _whatsapp_worker():
+    """Drain the send queue, marking samples sent on success"""
+    while True:
+        sample_id, phone, message = _send_queue.get()
+        try:
+            if simulate_whatsapp_send(phone, message):
+                with get_conn() as conn:
+                    with conn:
+                        conn.execute(SQL_MARK_RESULTS_SENT, (sample_id,))
+                bump_data_version()
+        except Exception as e:
+            print(f"[WhatsApp] Failed to send results for {sample_id}: {e}")
+        finally:
+            _send_queue.task_done()
+
+def enqueue_whatsapp_send(sample_id, phone, message):
+    """Queue a message for the background sender, starting it on first use"""
+    global _send_worker
+    with _send_worker_lock:
+        if _send_worker is None:
+            _send_worker = threading.Thread(target=_whatsapp_worker, daemon=True)
+            _send_worker.start()
+    _send_queue.put((sample_id, phone, message))
+
+# Lists are paginated so response size and row materialization stay
+# bounded no matter how large the tables grow.
+PAGE_SIZE = 50
+
+def _page_nav(path, page, has_next):
+    """Render the prev/next pagination links for a list page as bytes"""
+    parts = []
+    if page > 1:
+        parts.append(f'<a href="{path}?page={page - 1}">&larr; Previous</a>')
+    if has_next:
+        parts.append(f'<a href="{path}?page={page + 1}">Next &rarr;</a>')
+    if not parts:
+        return b''
+    return ('<p>' + ' | '.join(parts) + '</p>').encode('utf-8')
+
+# ASCII-only uppercase for patient IDs: str.translate with a built
+# table skips the locale-aware Unicode casing machinery str.upper pays
+# for, and IDs are defined as ASCII (PAT%06d)
+_ASCII_UPPER = str.maketrans('abcdefghijklmnopqrstuvwxyz',
+                             'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+def _patient_display_name(patient):
+    """Escaped "First Last (PAT000001)" string for form headers"""
+    return f"{_esc(patient['first_name'])} {_esc(patient['last_name'])} ({patient['patient_id']})"
+
+
+def _compile_prefix_routes(routes):
+    """Compile prefix routes into one regex matched in a single scan.
+
+    Every prefix has the shape '/word/', so the words become one
+    alternation and the trailing id segment is captured by the 'arg'
+    group. Dispatch is a single C-level regex match plus a dict lookup
+    instead of a Python loop over startswith calls. Returns the compiled
+    pattern and the route-word -> handler-name table.
+    """
+    words = {prefix.strip('/'): handler for prefix, handler in routes}
+    pattern = re.compile(
+        '/(?P<route>%s)/(?P<arg>[^/]+)$' % '|'.join(map(re.escape, words)))
+    return pattern, words
+
+
+class DemographicHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 lets clients reuse the TCP connection across requests;
+    # requires every response to carry an accurate Content-Length.
+    protocol_version = "HTTP/1.1"
+
+    # Buffer outgoing writes so status line, headers and body chunks
+    # coalesce into a few large write(2) calls instead of one syscall
+    # per wfile.write; handle_one_request flushes after each response.
+    wbufsize = 16 * 1024
+
+    # Routing tables: exact paths map straight to a handler method name,
+    # prefixed paths carry the trailing id segment as an argument. Dict
+    # lookup replaces the long elif chain so exact routes dispatch in O(1).
+    GET_ROUTES = {
+        '/': 'send_dashboard',
+        '/patients': 'send_patients_list',
+        '/locations': 'send_locations_list',
+        '/blood_samples': 'send_blood_samples_list',
+        '/register_patient': 'send_register_patient_form',
+        '/search_patient': 'send_search_patient_form',
+        '/add_location': 'send_add_location_form',
+        '/static/forms.css': 'send_forms_css',
+    }
+    GET_PREFIX_ROUTES = (
+        ('/patient/', 'send_patient_details'),
+        ('/add_health_record/', 'send_add_health_record_form'),
+        ('/collect_blood_sample/', 'send_collect_blood_sample_form'),
+        ('/update_test_results/', 'send_update_test_results_form'),
+        ('/send_results/', 'handle_send_results'),
+        ('/qr/', 'send_qr_png'),
+    )
+    GET_PREFIX_RE, GET_PREFIX_HANDLERS = _compile_prefix_routes(GET_PREFIX_ROUTES)
+    POST_ROUTES = {
+        '/register_patient': 'handle_register_patient',
+        '/search_patient': 'handle_search_patient',
+        '/add_location': 'handle_add_location',
+        '/bulk_register_patients': 'handle_bulk_register',
+        '/bulk_add_health_records': 'handle_bulk_add_health_records',
+    }
+    POST_PREFIX_ROUTES = (
+        ('/add_health_record/', 'handle_add_health_record'),
+        ('/collect_blood_sample/', 'handle_collect_blood_sample'),
+        ('/update_test_results/', 'handle_update_test_results'),
+    )
+    POST_PREFIX_RE, POST_PREFIX_HANDLERS = _compile_prefix_routes(POST_PREFIX_ROUTES)
+
+    def do_GET(self):
+        """Handle GET requests"""
+        path, _, self.query = self.path.partition('?')
+        handler = self.GET_ROUTES.get(path)
+        if handler is not None:
+            getattr(self, handler)()
+            return
+        match = self.GET_PREFIX_RE.match(path)
+        if match is not None:
+            handler = self.GET_PREFIX_HANDLERS[match.group('route')]
+            getattr(self, handler)(match.group('arg'))
+            return
+        self.send_error(404, "Page not found")
+    
+    def do_POST(self):
+        """Handle POST requests"""
+        data = self.parse_form()
+        
+        handler = self.POST_ROUTES.get(self.path)
+        if handler is not None:
+            getattr(self, handler)(data)
+            return
+        match = self.POST_PREFIX_RE.match(self.path)
+        if match is not None:
+            handler = self.POST_PREFIX_HANDLERS[match.group('route')]
+            getattr(self, handler)(match.group('arg'), data)
+            return
+        self.send_error(404, "Action not found")
+    
+    def _page_number(self):
+        """1-based page number from the query string, defaulting to 1"""
+        for key, value in urllib.parse.parse_qsl(self.query):
+            if key == 'page' and value.isdigit() and int(value) > 0:
+                return int(value)
+        return 1
+
+    def parse_form(self):
+        """Read the request body into a flat field -> value dict.
+
+        Forms here never repeat a field name, so parse_qsl avoids the
+        one-element lists (and the [0] indexing at every use site) that
+        parse_qs would produce.
+        """
+        content_length = int(self.headers['Content-Length'])
+        post_data = self.rfile.read(content_length)
+        return dict(urllib.parse.parse_qsl(post_data.decode('utf-8'),
+                                           keep_blank_values=True))
+
+    def send_html_response(self, content):
+        """Send HTML response; accepts str or already-encoded bytes"""
+        body = content if isinstance(content, bytes) else content.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_static_page(self, body):
+        """Send a pre-encoded static page, letting clients cache it"""
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'public, max-age=3600')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_qr_png(self, name):
+        """Serve a patient QR code as a cacheable PNG"""
+        if qrcode is None or not name.endswith('.png'):
+            self.send_error(404, "QR code not available")
+            return
+        png = _qr_png(name[:-4])
+        self.send_response(200)
+        self.send_header('Content-type', 'image/png')
+        self.send_header('Content-Length', str(len(png)))
+        self.send_header('Cache-Control', 'public, max-age=86400')
+        self.end_headers()
+        self.wfile.write(png)
+
+    def send_forms_css(self):
+        """Serve the shared form stylesheet from the in-memory copy"""
+        if self.headers.get('If-None-Match') == FORMS_CSS_ETAG:
+            self.send_response(304)
+            self.send_header('ETag', FORMS_CSS_ETAG)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-type', 'text/css')
+        self.send_header('Content-Length', str(len(FORMS_CSS)))
+        self.send_header('ETag', FORMS_CSS_ETAG)
+        self.send_header('Cache-Control', 'public, max-age=86400')
+        self.end_headers()
+        self.wfile.write(FORMS_CSS)
+
+    def send_html_chunks(self, *chunks):
+        """Send an HTML response assembled from pre-encoded bytes chunks"""
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html')
+        self.send_header('Content-Length', str(sum(len(c) for c in chunks)))
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(chunk)
+
+    def check_data_etag(self, suffix=''):
+        """Validate If-None-Match against the data-version ETag.
+
+        Returns the ETag to attach to a full response, or None if a 304
+        was already sent — callers return immediately in that case,
+        skipping the query and render entirely. suffix distinguishes
+        variants of the same resource (e.g. pages of a list).
+        """
+        etag = f'"{_BOOT_NONCE}-{current_data_version()}{suffix}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return None
+        return etag
+
+    def send_chunked_html(self, chunks, etag=None):
+        """Stream an HTML response using chunked transfer encoding.
+
+        chunks is an iterable of bytes written as they are produced, so
+        peak memory stays bounded by a single chunk and the client can
+        start rendering before the full result set has been read.
+        """
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html')
+        self.send_header('Transfer-Encoding', 'chunked')
+        if etag is not None:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        write = self.wfile.write
+        for chunk in chunks:
+            if chunk:
+                write(b'%x\r\n' % len(chunk))
+                write(chunk)
+                write(b'\r\n')
+        write(b'0\r\n\r\n')
+
+    def send_redirect(self, location):
+        """Send a 302 redirect with an empty body"""
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def send_dashboard(self):
+        """Send dashboard page, cached until the data version moves"""
+        etag = self.check_data_etag()
+        if etag is None:
+            return
+        version = current_data_version()
+
+        with _dashboard_cache_lock:
+            if (_dashboard_cache['db'] == DATABASE
+                    and _dashboard_cache['version'] == version):
+                page = _dashboard_cache['body']
+            else:
+                page = DASHBOARD_HEAD + self._dashboard_body() + DASHBOARD_TAIL
+                _dashboard_cache['db'] = DATABASE
+                _dashboard_cache['version'] = version
+                _dashboard_cache['body'] = page
+
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html')
+        self.send_header('Content-Length', str(len(page)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(page)
+
+    def _dashboard_body(self):
+        """Build the dynamic middle of the dashboard as bytes"""
+        with get_conn() as conn:
+            cursor = conn.cursor()
+
+            # One round-trip for all three stats instead of three COUNTs
+            cursor.execute(SQL_DASHBOARD_COUNTS)
+            total_patients, total_locations, pending_samples = cursor.fetchone()
+
+            cursor.execute(SQL_RECENT_PATIENTS)
+            recent_patients = cursor.fetchall()
+
+        body = f'''
+            <div class="stats">
+                <div class="stat-card">
+                    <h3>{total_patients}</h3>
+                    <p>Total Patients</p>
+                </div>
+                <div class="stat-card">
+                    <h3>{total_locations}</h3>
+                    <p>Locations</p>
+                </div>
+                <div class="stat-card">
+                    <h3>{pending_samples}</h3>
+                    <p>Pending Tests</p>
+                </div>
+            </div>
+
+            <div class="actions">
+                <h3>Quick Actions</h3>
+                <a href="/register_patient" class="btn">Register New Patient</a>
+                <a href="/search_patient" class="btn">Search Patient</a>
+                <a href="/add_location" class="btn">Add Location</a>
+            </div>
+
+            <div class="recent">
+                <h3>Recent Patients</h3>
+                {''.join([_e(ROW_RECENT_PATIENT, (p['patient_id'], p['first_name'], p['last_name'], p['patient_id'], p['location_name'])) for p in recent_patients]) if recent_patients else '<p>No patients registered yet.</p>'}
+            </div>
         '''
-        self.send_html_response(html)
+        return body.encode('utf-8')
+
+    def send_register_patient_form(self):
+        """Send patient registration form"""
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            location_options = get_location_options(cursor)
+
+        self.send_html_response(REGISTER_PATIENT_FORM.substitute(
+            location_options=location_options))
     
-    def handle_update_test_results(self, sample_id, data):
-        """Handle updating test results"""
+    def handle_register_patient(self, data):
+        """Handle patient registration"""
         try:
-            conn = sqlite3.connect(DATABASE)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE blood_samples 
-                SET test_location_id = ?, results = ?, tested_by = ?, 
-                    tested_at = CURRENT_TIMESTAMP, status = 'tested'
-                WHERE sample_id = ?
-            ''', (
-                data['test_location_id'][0],
-                data['results'][0],
-                data['tested_by'][0],
-                sample_id
-            ))
-            conn.commit()
-            conn.close()
+            with get_conn() as conn:
+                # The connection context manager wraps both statements in
+                # one explicit transaction: a single commit (one fsync)
+                # instead of an autocommit per statement.
+                with conn:
+                    cursor = conn.cursor()
+                    cursor.execute(SQL_INSERT_PATIENT, (
+                        '',  # placeholder, replaced before commit
+                        data['first_name'],
+                        data['last_name'],
+                        data['date_of_birth'],
+                        data['gender'],
+                        data['phone'],
+                        data.get('email', ''),
+                        data.get('address', ''),
+                        data.get('emergency_contact', ''),
+                        data['location_id']
+                    ))
+                    patient_id = assign_patient_id(cursor)
+
+            bump_data_version()
+
+            # Redirect to patient details
+            self.send_redirect(f'/patient/{patient_id}')
             
-            # Redirect back to blood samples
-            self.send_response(302)
-            self.send_header('Location', '/blood_samples')
-            self.end_headers()
+        except Exception as e:
+            self.send_error(500, f"Registration failed: {str(e)}")
+    
+    def send_patient_details(self, patient_id):
+        """Send patient details page"""
+        with get_conn() as conn:
+            cursor = conn.cursor()
+
+            # Patient row plus both histories in one round-trip
+            cursor.execute(SQL_GET_PATIENT_DETAILS, (patient_id,))
+            patient = cursor.fetchone()
+
+            if not patient:
+                self.send_error(404, "Patient not found")
+                return
+
+        # json_group_array gives no ordering guarantee, so sort the small
+        # per-patient lists here
+        health_records = json.loads(patient['health_records_json'])
+        health_records.sort(key=lambda r: r['recorded_at'] or '', reverse=True)
+        blood_samples = json.loads(patient['blood_samples_json'])
+        blood_samples.sort(key=lambda s: s['collected_at'] or '', reverse=True)
+        
+        # Generate simple QR code placeholder
+        qr_code = generate_qr_code_simple(patient_id)
+        
+        health_records_html = ''
+        if health_records:
+            rows = ['<h3>Health Records</h3><table border="1" style="width:100%; border-collapse: collapse;">',
+                    '<tr><th>Date</th><th>Location</th><th>Height</th><th>Weight</th><th>Temperature</th><th>BP</th><th>Heart Rate</th><th>Recorded By</th></tr>']
+            append = rows.append
+            for record in health_records:
+                bp_s = record['bp_systolic']
+                bp_d = record['bp_diastolic']
+                bp = f"{bp_s}/{bp_d}" if bp_s and bp_d else "-"
+                append(_e(ROW_HEALTH_RECORD, (record['recorded_at'], record['location_name'],
+                                             record['height'] or "-", record['weight'] or "-",
+                                             record['temperature'] or "-", bp,
+                                             record['heart_rate'] or "-", record['recorded_by'])))
+            append('</table>')
+            health_records_html = ''.join(rows)
+
+        blood_samples_html = ''
+        if blood_samples:
+            rows = ['<h3>Blood Samples</h3><table border="1" style="width:100%; border-collapse: collapse;">',
+                    '<tr><th>Sample ID</th><th>Test Type</th><th>Status</th><th>Collection Date</th><th>Actions</th></tr>']
+            append = rows.append
+            for sample in blood_samples:
+                action = ""
+                if sample['status'] == 'collected':
+                    action = f'<a href="/update_test_results/{sample["sample_id"]}">Update Results</a>'
+                elif sample['status'] == 'tested':
+                    action = f'<a href="/send_results/{sample["sample_id"]}">Send Results</a>'
+                append(ROW_PATIENT_SAMPLE % (E(str(sample['sample_id'])), E(str(sample['test_type'])), E(str(sample['status'])), E(str(sample['collected_at'])), action))
+            append('</table>')
+            blood_samples_html = ''.join(rows)
+        
+        dynamic = f'''
+            <div class="nav">
+                <a href="/">← Dashboard</a> | <a href="/patients">Patients</a>
+            </div>
+
+            <div class="patient-info">
+                <h2>Patient Details - {patient['patient_id']}</h2>
+                <p><strong>Name:</strong> {E(patient['first_name'])} {E(patient['last_name'])}</p>
+                <p><strong>Date of Birth:</strong> {E(str(patient['date_of_birth']))}</p>
+                <p><strong>Gender:</strong> {E(patient['gender'])}</p>
+                <p><strong>Phone:</strong> {E(patient['phone'])}</p>
+                <p><strong>Email:</strong> {E(patient['email'] or 'N/A')}</p>
+                <p><strong>Address:</strong> {E(patient['address'] or 'N/A')}</p>
+                <p><strong>Emergency Contact:</strong> {E(patient['emergency_contact'] or 'N/A')}</p>
+                <p><strong>Registered at:</strong> {E(patient['location_name'])}</p>
+            </div>
+
+            <div class="qr">
+                <h4>Patient QR Code</h4>
+                <p>{qr_code}</p>
+                <small>Use this to quickly access patient information</small>
+            </div>
+
+            <div class="actions">
+                <a href="/add_health_record/{patient['patient_id']}" class="btn">Add Health Record</a>
+                <a href="/collect_blood_sample/{patient['patient_id']}" class="btn">Collect Blood Sample</a>
+            </div>
+
+            {health_records_html}
+            {blood_samples_html}
+        '''
+        title = f"{E(patient['first_name'])} {E(patient['last_name'])}"
+        self.send_html_chunks(PATIENT_DETAIL_TITLE_OPEN, title.encode('utf-8'),
+                              PATIENT_DETAIL_HEAD, dynamic.encode('utf-8'), PAGE_TAIL)
+    
+    def send_patients_list(self):
+        """Send patients list page, streaming one page of rows"""
+        page = self._page_number()
+        etag = self.check_data_etag(f'-p{page}')
+        if etag is None:
+            return
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            # One extra row tells us whether a next page exists
+            cursor.execute(SQL_LIST_PATIENTS,
+                           (PAGE_SIZE + 1, (page - 1) * PAGE_SIZE))
+            self.send_chunked_html(self._patients_list_chunks(cursor, page),
+                                   etag=etag)
+
+    def _patients_list_chunks(self, cursor, page):
+        """Yield the patients page as bytes chunks, one table row at a time"""
+        yield PATIENTS_LIST_HEAD
+        patient = cursor.fetchone()
+        if patient is None and page == 1:
+            yield b'<p>No patients registered yet.</p>'
+        else:
+            yield PATIENTS_TABLE_OPEN
+            shown = 0
+            while patient is not None and shown < PAGE_SIZE:
+                yield _e(ROW_PATIENT, (patient['patient_id'], patient['first_name'], patient['last_name'],
+                                       patient['date_of_birth'], patient['gender'], patient['phone'],
+                                       patient['location_name'], patient['patient_id'])).encode('utf-8')
+                shown += 1
+                patient = cursor.fetchone()
+            yield b'</table>'
+            yield _page_nav('/patients', page, patient is not None)
+        yield PAGE_TAIL
+
+    def send_locations_list(self):
+        """Send locations list page, streaming rows as the cursor yields them"""
+        etag = self.check_data_etag()
+        if etag is None:
+            return
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_LIST_LOCATIONS)
+            self.send_chunked_html(self._locations_list_chunks(cursor), etag=etag)
+
+    def _locations_list_chunks(self, cursor):
+        """Yield the locations page as bytes chunks, one table row at a time"""
+        yield LOCATIONS_LIST_HEAD
+        location = cursor.fetchone()
+        if location is None:
+            yield b'<p>No locations added yet.</p>'
+        else:
+            yield LOCATIONS_TABLE_OPEN
+            while location is not None:
+                yield _e(ROW_LOCATION, (location['name'], location['address'] or "N/A",
+                                        location['phone'] or "N/A", location['created_at'])).encode('utf-8')
+                location = cursor.fetchone()
+            yield b'</table>'
+        yield PAGE_TAIL
+
+    def send_blood_samples_list(self):
+        """Send blood samples list page, streaming one page of rows"""
+        page = self._page_number()
+        etag = self.check_data_etag(f'-p{page}')
+        if etag is None:
+            return
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            # One extra row tells us whether a next page exists
+            cursor.execute(SQL_LIST_SAMPLES,
+                           (PAGE_SIZE + 1, (page - 1) * PAGE_SIZE))
+            self.send_chunked_html(self._blood_samples_list_chunks(cursor, page),
+                                   etag=etag)
+
+    def _blood_samples_list_chunks(self, cursor, page):
+        """Yield the blood samples page as bytes chunks, one table row at a time"""
+        yield SAMPLES_LIST_HEAD
+        sample = cursor.fetchone()
+        if sample is None and page == 1:
+            yield b'<p>No blood samples collected yet.</p>'
+        else:
+            yield SAMPLES_TABLE_OPEN
+            shown = 0
+            while sample is not None and shown < PAGE_SIZE:
+                action = ""
+                if sample['status'] == 'collected':
+                    action = f'<form method="POST" action="/update_test_results/{sample["sample_id"]}" style="display:inline;"><button type="submit">Update Results</button></form>'
+                elif sample['status'] == 'tested':
+                    action = f'<a href="/send_results/{sample["sample_id"]}" style="background: #28a745; color: white; padding: 5px 10px; text-decoration: none; border-radius: 3px;">Send Results</a>'
+                yield (ROW_SAMPLE % tuple([E(str(v)) for v in (sample['sample_id'], sample['patient_code'],
+                                          sample['first_name'], sample['last_name'],
+                                          sample['patient_code'], sample['test_type'],
+                                          sample['status'], sample['collected_at'])] + [action])).encode('utf-8')
+                shown += 1
+                sample = cursor.fetchone()
+            yield b'</table>'
+            yield _page_nav('/blood_samples', page, sample is not None)
+        yield PAGE_TAIL
+
+    def handle_bulk_register(self, data):
+        """Register many patients from CSV rows in one transaction.
+
+        Expects a 'csv' form field with one patient per line:
+        first_name,last_name,date_of_birth,gender,phone,email,address,emergency_contact,location_id
+        A single executemany inside one transaction costs one fsync for
+        the whole batch instead of one per patient.
+        """
+        try:
+            rows = []
+            for line in data['csv'].splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                fields = line.split(',')
+                if len(fields) != 9:
+                    self.send_error(400, f"Expected 9 fields, got {len(fields)}: {line}")
+                    return
+                # unique interim IDs: patient_id is UNIQUE, so the
+                # single '' placeholder the form path uses would collide
+                rows.append((f'PENDING-{len(rows)}',) + tuple(fields))
+
+            with get_conn() as conn:
+                with conn:
+                    cursor = conn.cursor()
+                    bulk_insert(cursor, SQL_INSERT_PATIENT, rows)
+                    cursor.execute(SQL_BACKFILL_PATIENT_IDS)
+
+            bump_data_version()
+            self.send_redirect('/patients')
+
+        except Exception as e:
+            self.send_error(500, f"Failed to bulk register patients: {str(e)}")
+
+    def handle_bulk_add_health_records(self, data):
+        """Add many health records from CSV rows in one transaction.
+
+        Expects a 'csv' form field with one record per line:
+        patient_id,location_id,height,weight,temperature,bp_systolic,bp_diastolic,heart_rate,notes,recorded_by
+        Empty numeric fields are stored as NULL.
+        """
+        try:
+            rows = []
+            for line in data['csv'].splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                fields = line.split(',')
+                if len(fields) != 10:
+                    self.send_error(400, f"Expected 10 fields, got {len(fields)}: {line}")
+                    return
+                patient_id, location_id = fields[0], fields[1]
+                vitals = fields[2:8]
+                notes, recorded_by = fields[8], fields[9]
+                rows.append((
+                    location_id,
+                    *(caster(value) if value else None
+                      for value, (_, caster) in zip(vitals, HEALTH_RECORD_FIELDS)),
+                    notes,
+                    recorded_by,
+                    patient_id,
+                ))
+
+            with get_conn() as conn:
+                with conn:
+                    bulk_insert(conn.cursor(), SQL_INSERT_HEALTH_RECORD, rows)
+
+            bump_data_version()
+            self.send_redirect('/patients')
+
+        except Exception as e:
+            self.send_error(500, f"Failed to bulk add health records: {str(e)}")
+
+    def send_search_patient_form(self):
+        """Send search patient form"""
+        self.send_static_page(SEARCH_PATIENT_PAGE)
+    
+    def send_add_location_form(self):
+        """Send add location form"""
+        self.send_static_page(ADD_LOCATION_PAGE)
+    
+    def handle_search_patient(self, data):
+        """Handle patient search"""
+        patient_id = data['patient_id'].strip().translate(_ASCII_UPPER)
+        # Redirect to patient details
+        self.send_redirect(f'/patient/{patient_id}')
+    
+    def handle_add_location(self, data):
+        """Handle adding a new location"""
+        try:
+            with get_conn() as conn:
+                with conn:
+                    conn.execute(SQL_INSERT_LOCATION, (
+                        data['name'],
+                        data.get('address', ''),
+                        data.get('phone', '')
+                    ))
+
+            invalidate_location_options()
+            bump_data_version()
+
+            # Redirect to locations list
+            self.send_redirect('/locations')
             
         except Exception as e:
-            self.send_error(500, f"Failed to update test results: {str(e)}")
+            self.send_error(500, f"Failed to add location: {str(e)}")
     
-    def handle_send_results(self, sample_id):
-        """Handle sending test results via WhatsApp"""
+    def send_add_health_record_form(self, patient_id):
+        """Send add health record form"""
+        with get_conn() as conn:
+            cursor = conn.cursor()
+
+            # Get patient info
+            cursor.execute(SQL_GET_PATIENT, (patient_id,))
+            patient = cursor.fetchone()
+
+            if not patient:
+                self.send_error(404, "Patient not found")
+                return
+
+            # Get locations dropdown (cached)
+            location_options = get_location_options(cursor)
+
+        self.send_html_response(ADD_HEALTH_RECORD_FORM.substitute(
+            patient_id=patient_id,
+            patient_name=_patient_display_name(patient),
+            location_options=location_options))
+    
+    def handle_add_health_record(self, patient_id, data):
+        """Handle adding health record"""
         try:
-            conn = sqlite3.connect(DATABASE)
+            with get_conn() as conn:
+                with conn:
+                    cursor = conn.cursor()
+
+                    # INSERT...SELECT resolves the internal patient id and
+                    # inserts in one statement; zero rowcount means the
+                    # patient does not exist
+                    cursor.execute(SQL_INSERT_HEALTH_RECORD, (
+                        data['location_id'],
+                        *(caster(data[field]) if data.get(field) else None
+                          for field, caster in HEALTH_RECORD_FIELDS),
+                        data.get('notes', ''),
+                        data['recorded_by'],
+                        patient_id
+                    ))
+
+                    if cursor.rowcount == 0:
+                        self.send_error(404, "Patient not found")
+                        return
+
+            bump_data_version()
+
+            # Redirect back to patient details
+            self.send_redirect(f'/patient/{patient_id}')
+            
+        except Exception as e:
+            self.send_error(500, f"Failed to add health record: {str(e)}")
+    
+    def send_collect_blood_sample_form(self, patient_id):
+        """Send collect blood sample form"""
+        with get_conn() as conn:
             cursor = conn.cursor()
+
+            # Get patient info
+            cursor.execute(SQL_GET_PATIENT, (patient_id,))
+            patient = cursor.fetchone()
+
+            if not patient:
+                self.send_error(404, "Patient not found")
+                return
+
+            # Get locations dropdown (cached)
+            location_options = get_location_options(cursor)
+
+        self.send_html_response(COLLECT_SAMPLE_FORM.substitute(
+            patient_id=patient_id,
+            patient_name=_patient_display_name(patient),
+            location_options=location_options))
+    
+    def handle_collect_blood_sample(self, patient_id, data):
+        """Handle blood sample collection"""
+        try:
+            with get_conn() as conn:
+                with conn:
+                    cursor = conn.cursor()
+
+                    # INSERT...SELECT resolves the internal patient id and
+                    # inserts in one statement; zero rowcount means the
+                    # patient does not exist
+                    cursor.execute(SQL_INSERT_BLOOD_SAMPLE, (
+                        '',  # placeholder, replaced before commit
+                        data['collection_location_id'],
+                        data['test_type'],
+                        data['collected_by'],
+                        patient_id
+                    ))
+
+                    if cursor.rowcount == 0:
+                        self.send_error(404, "Patient not found")
+                        return
+
+                    assign_sample_id(cursor)
+
+            bump_data_version()
+
+            # Redirect back to patient details
+            self.send_redirect(f'/patient/{patient_id}')
             
-            # Get sample and patient info
-            cursor.execute('''
-                SELECT bs.*, p.first_name, p.last_name, p.patient_id, p.phone 
-                FROM blood_samples bs
-                JOIN patients p ON bs.patient_id = p.id
-                WHERE bs.sample_id = ? AND bs.status = 'tested'
-            ''', (sample_id,))
+        except Exception as e:
+            self.send_error(500, f"Failed to collect blood sample: {str(e)}")
+    
+    def send_update_test_results_form(self, sample_id):
+        """Send update test results form"""
+        with get_conn() as conn:
+            cursor = conn.cursor()
+
+            # Get sample info
+            cursor.execute(SQL_GET_SAMPLE_WITH_PATIENT, (sample_id,))
             sample = cursor.fetchone()
-            
+
             if not sample:
-                self.send_error(404, "Sample not found or not tested")
+                self.send_error(404, "Sample not found")
                 return
-            
-            # Format WhatsApp message
-            message = f"""
-🏥 MEDICAL TEST RESULTS 🏥
 
-Patient: {sample[-4]} {sample[-3]}
-Patient ID: {sample[-2]}
-Sample ID: {sample[1]}
-Test Type: {sample[7]}
+            # Get locations dropdown (cached)
+            location_options = get_location_options(cursor)
 
-Results:
-{sample[9]}
+        self.send_html_response(UPDATE_RESULTS_FORM.substitute(
+            sample_id=sample['sample_id'],
+            patient_name=f"{E(sample['first_name'])} {E(sample['last_name'])} ({sample['patient_code']})",
+            test_type=E(sample['test_type']),
+            tested_by=E(sample['tested_by'] or ''),
+            results=E(sample['results'] or ''),
+            location_options=location_options))
+    
+    def handle_update_test_results(self, sample_id, data):
+        """Handle updating test results"""
+        try:
+            with get_conn() as conn:
+                with conn:
+                    conn.execute(SQL_UPDATE_TEST_RESULTS, (
+                        data['test_location_id'],
+                        data['results'],
+                        data['tested_by'],
+                        sample_id
+                    ))
 
-Tested by: {sample[10]}
-Test Date: {sample[11]}
+            bump_data_version()
 
-For questions, please contact your healthcare provider.
-            """
-            
-            # Simulate WhatsApp sending
-            success = simulate_whatsapp_send(sample[-1], message)
-            
-            if success:
-                # Update status to results_sent
-                cursor.execute('''
-                    UPDATE blood_samples 
-                    SET status = 'results_sent', results_sent_at = CURRENT_TIMESTAMP
-                    WHERE sample_id = ?
-                ''', (sample_id,))
-                conn.commit()
-            
-            conn.close()
+            # Redirect back to blood samples
+            self.send_redirect('/blood_samples')
             
+        except Exception as e:
+            self.send_error(500, f"Failed to update test results: {str(e)}")
+    
+    def handle_send_results(self, sample_id):
+        """Handle sending test results via WhatsApp"""
+        try:
+            with get_conn() as conn:
+                cursor = conn.cursor()
+
+                # Get sample and patient info
+                cursor.execute(SQL_GET_TESTED_SAMPLE, (sample_id,))
+                sample = cursor.fetchone()
+
+                if not sample:
+                    self.send_error(404, "Sample not found or not tested")
+                    return
+
+                # Format WhatsApp message from the precompiled template
+                message = WHATSAPP_MESSAGE.substitute(
+                    first_name=sample['first_name'],
+                    last_name=sample['last_name'],
+                    patient_code=sample['patient_code'],
+                    sample_id=sample['sample_id'],
+                    test_type=sample['test_type'],
+                    results=sample['results'],
+                    tested_by=sample['tested_by'],
+                    tested_at=sample['tested_at'],
+                )
+
+            # Hand the message to the background sender; the worker flips
+            # the status to results_sent once the send succeeds
+            enqueue_whatsapp_send(sample_id, sample['phone'], message)
+
             # Redirect back to blood samples with success message
-            self.send_response(302)
-            self.send_header('Location', '/blood_samples')
-            self.end_headers()
+            self.send_redirect('/blood_samples')
             
         except Exception as e:
             self.send_error(500, f"Failed to send results: {str(e)}")
 
 # Additional handler methods would go here...
 
+# WAL checkpointing: with several long-lived pooled connections the
+# automatic checkpoints can keep falling behind under constant reads, so
+# a background thread periodically forces the WAL back into the main
+# database file and truncates it.
+CHECKPOINT_INTERVAL = 60  # seconds
+
+def _checkpoint_worker():
+    """Periodically fold the WAL into the main database file"""
+    while True:
+        time.sleep(CHECKPOINT_INTERVAL)
+        try:
+            with get_conn() as conn:
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        except sqlite3.Error as e:
+            print(f"[Checkpoint] wal_checkpoint failed: {e}")
+
+def start_checkpoint_thread():
+    """Start the daemon WAL-checkpoint thread"""
+    threading.Thread(target=_checkpoint_worker, daemon=True).start()
+
+class DemographicServer(http.server.ThreadingHTTPServer):
+    """Threaded server that additionally binds with SO_REUSEPORT.
+
+    With SO_REUSEPORT set (where the platform offers it), extra server
+    processes can bind the same port and the kernel load-balances
+    accepted connections between them — scale-out beyond one process is
+    then just launching the script again, with no restart gap since the
+    old listener keeps draining while the new one binds.
+    """
+    daemon_threads = True
+
+    def server_bind(self):
+        if hasattr(socket, 'SO_REUSEPORT'):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
 def main():
     """Main function to start the server"""
     # Initialize database
     init_database()
+
+    # Keep the WAL bounded while the pooled connections stay open
+    start_checkpoint_thread()
     
-    # Start HTTP server
+    # Start HTTP server (threaded so DB-bound requests don't serialize)
     PORT = 8000
-    with socketserver.TCPServer(("", PORT), DemographicHandler) as httpd:
+    with DemographicServer(("", PORT), DemographicHandler) as httpd:
         print(f"Server running at http://localhost:{PORT}")
         print("Press Ctrl+C to stop the server")
         try: